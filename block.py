@@ -0,0 +1,95 @@
+from typing import Self, cast
+
+from component import Component
+from connect import Point, Connectable, Pin, Wire
+
+
+class Block:
+    """
+    A reusable sub-layout: a group of parts and the wires between them,
+    positioned relative to the block's own origin.
+
+    The pin footprint and internal nets are worked out once per block,
+    so each instance only needs to clone the parts and offset them.
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self.parts: dict[str, Component] = {}
+        self.nets: list[tuple[tuple[str, str], tuple[str, str], str]] = []
+        self._footprint: list[tuple[str, str, Point]] | None = None
+        self.count = 0
+
+    def __getattr__(self, name: str) -> Component:
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return self.parts[name]
+
+    def add(self, part: Component, at=Point(), rotation: int | None=None) -> Component:
+        """Add a part with its origin at the block-local point `at`"""
+        part.set_transform(at=at, rotation=rotation)
+        self.parts[part.name] = part
+        self._footprint = None
+        return part
+
+    def wiring(self, *wires: Wire, color=None):
+        """Add wires between pins of the block's own parts"""
+        for wire in wires:
+            (a, b) = wire.ends
+            assert a.owner.name in self.parts and b.owner.name in self.parts, \
+                f"Block {self.name} can only wire its own parts, not {a.name} - {b.name}"
+            self.nets.append((self.key(a), self.key(b), color or wire.color))
+
+    def key(self, c: Connectable) -> tuple[str, str]:
+        return c.owner.name, next(k for (k, v) in c.owner.connectables.items() if v is c)
+
+    @property
+    def footprint(self) -> list[tuple[str, str, Point]]:
+        """(part, pin, block-local position) for every pin in the block"""
+        if self._footprint is None:
+            self._footprint = [
+                (part.name, k, pin.at_global)
+                for part in self.parts.values()
+                for (k, pin) in part.connectables.items()
+            ]
+        return self._footprint
+
+    def new(self, aka='') -> 'BlockInstance':
+        self.count += 1
+        return BlockInstance(self, aka or f"{self.name}{self.count}")
+
+
+class BlockInstance:
+    """A copy of a block's parts, placed as a unit with `instance @ tie`"""
+    def __init__(self, block: Block, name: str):
+        self.block = block
+        self.name = name
+        self.parts = {
+            k: part.clone(f"{name}.{part.name}")
+            for (k, part) in block.parts.items()
+        }
+
+    def __getattr__(self, name: str) -> Component:
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return self.parts[name]
+
+    def __matmul__(self, tie: Connectable) -> tuple[Self, Connectable]:
+        return (self, tie)
+
+    def move(self, origin: Point):
+        """Offset every part so the block origin lies at `origin`"""
+        for (k, part) in self.block.parts.items():
+            self.parts[k].set_transform(at=Point(origin.x + part.at.x, origin.y + part.at.y))
+
+    def footprint(self, origin: Point) -> list[tuple[Pin, Point]]:
+        """Each pin of the instance and its global position with the block origin at `origin`"""
+        return [
+            (cast(Pin, self.parts[k].connectables[pin]), Point(origin.x + at.x, origin.y + at.y))
+            for (k, pin, at) in self.block.footprint
+        ]
+
+    def wires(self) -> list[Wire]:
+        return [
+            Wire(self.parts[a].connectables[pa], self.parts[b].connectables[pb], color)
+            for ((a, pa), (b, pb), color) in self.block.nets
+        ]
@@ -1,9 +1,53 @@
 import svg
-from typing import cast
+import re
+import gzip
+from typing import cast, Iterable
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from math import ceil, floor
+from itertools import repeat
 from itertools import groupby
 from dataclasses import dataclass, field
-from connect import Point, Connectable, Tie, Pin, Wire, ConnectedGroup, distance
+from connect import Point, Box, Connectable, Tie, Pin, Wire, ConnectedGroup, distance
 from component import Component
+from route import Router
+from block import BlockInstance
+from spatial import SpatialIndex
+from canvas import Canvas
+from transposition import zobrist
+
+
+# only geometry is rounded, so names in class lists and the like are left alone
+_geometry = (
+    'x', 'y', 'width', 'height', 'x1', 'y1', 'x2', 'y2', 'cx', 'cy', 'r', 'rx', 'ry',
+    'dx', 'dy', 'points', 'd', 'transform', 'viewBox',
+)
+_attribute = re.compile(r'(\s(?:' + '|'.join(_geometry) + r')=")([^"]*)(")')
+_number = re.compile(r'(?<![\w.])-?(?:\d+\.\d*|\.\d+|\d+)(?:[eE][-+]?\d+)?')
+
+
+def format_number(v: float, precision: int) -> str:
+    """Format v with at most precision decimals, dropping trailing zeros"""
+    s = f"{v:.{precision}f}"
+    if '.' in s:
+        s = s.rstrip('0').rstrip('.')
+    return '0' if s == '-0' else s
+
+
+def round_attributes(text: str, precision: int) -> str:
+    """Round every number appearing in the value of an svg geometry attribute"""
+    def number(m: re.Match) -> str:
+        return format_number(float(m.group(0)), precision)
+
+    def attribute(m: re.Match) -> str:
+        return m.group(1) + _number.sub(number, m.group(2)) + m.group(3)
+
+    return _attribute.sub(attribute, text)
+
+
+def render_part(part: Component, region: tuple[Point, Point] | None=None) -> str:
+    """Draw and serialize a single part, run in a worker by BreadboardLayout.draw"""
+    return str(part.draw(region))
 
 
 class BreadboardPart(Component):
@@ -12,8 +56,28 @@ class BreadboardPart(Component):
 
     def __getattr__(self, name: str) -> Connectable:
         """Get a connectable by name"""
+        if name.startswith('__'):
+            raise AttributeError(name)
         return self.connectables[name.upper()]          # case-insensitive
 
+    def draw_ties(self, region: tuple[Point, Point] | None=None):
+        # the shared class lives on the group rather than on every tie
+        return svg.G(
+            class_=['ties'],
+            elements=[
+                svg.Rect(
+                    width=0.4, height=0.4,
+                    x=tie.at_local.x-0.2, y=tie.at_local.y-0.2,
+                )
+                for tie in self.connectables.values()
+                if self.visible(tie.at_local, region)
+            ]
+        )
+
+    def paint_ties(self, canvas: Canvas):
+        for tie in self.connectables.values():
+            canvas.rect(self, [self.kind(), ['ties'], []], tie.at_local.x-0.2, tie.at_local.y-0.2, 0.4, 0.4)
+
     def rails(self) -> list[ConnectedGroup]:
         ties = cast(list[Tie], list(self.connectables.values()))
         groups = groupby(sorted(ties, key=lambda t: t.rail), lambda t: t.rail)
@@ -46,33 +110,38 @@ class BreadboardMain(BreadboardPart):
         ]
         self.connectables = {t.name: t for t in ties}
 
-    def draw(self):
-        g = super().draw()
+    def paint(self, canvas: Canvas):
+        super().paint(canvas)
+        canvas.rect(self, [self.kind(), ['groove']], 5, -self.padding.y, 1, self.shape.y + 2*self.padding.y)
+        self.paint_ties(canvas)
+        for r in range(64):
+            canvas.text(self, [self.kind(), []], -1, r, str(r))
+            canvas.text(self, [self.kind(), []], 12, r, str(r))
+        for c in range(12):
+            if c not in (5,6):
+                canvas.text(self, [self.kind(), []], c, -1, self._cols[c])
+                canvas.text(self, [self.kind(), []], c, 64, self._cols[c])
+
+    def draw(self, region: tuple[Point, Point] | None=None):
+        g = super().draw(region)
 
         g.elements.append(svg.Rect(
             x=5, y=-self.padding.y,
             width=1, height=self.shape.y + 2*self.padding.y,
             class_=['groove']
         ))
-        g.elements += [
-            svg.Rect(
-                width=0.4, height=0.4,
-                x=tie.at_local.x-0.2, y=tie.at_local.y-0.2,
-                class_=['tie']
-            )
-            for tie in self.connectables.values()
-        ]
+        g.elements.append(self.draw_ties(region))
         g.elements += [
             t for r in range(64) for t in [
                 svg.Text(text=str(r), x=-1, y=r),
                 svg.Text(text=str(r), x=12, y=r)
-            ]
+            ] if self.visible(Point(t.x, t.y), region)
         ]
         g.elements += [
             t for c in range(12) for t in [
                 svg.Text(text=self._cols[c], x=c, y=-1),
                 svg.Text(text=self._cols[c], x=c, y=64)
-            ] if c not in (5,6)
+            ] if c not in (5,6) and self.visible(Point(t.x, t.y), region)
         ]
         return g
 
@@ -91,17 +160,19 @@ class BreadboardRail(BreadboardPart):
         ]
         self.connectables = {t.name: t for t in ties}
 
-    def draw(self):
-        g = super().draw()
+    def paint(self, canvas: Canvas):
+        super().paint(canvas)
+        self.paint_ties(canvas)
+        canvas.line(self, [self.kind(), [self._cols[0]]], -1, 1, -1, 61)
+        canvas.line(self, [self.kind(), [self._cols[1]]], 2, 1, 2, 61)
+        for c in range(2):
+            canvas.text(self, [self.kind(), [self._cols[c]]], 2*c-1/2, 0, self._syms[c])
+            canvas.text(self, [self.kind(), [self._cols[c]]], 2*c-1/2, 62, self._syms[c])
 
-        g.elements += [
-            svg.Rect(
-                width=0.4, height=0.4,
-                x=tie.at_local.x-0.2, y=tie.at_local.y-0.2,
-                class_=['tie']
-            )
-            for tie in self.connectables.values()
-        ]
+    def draw(self, region: tuple[Point, Point] | None=None):
+        g = super().draw(region)
+
+        g.elements.append(self.draw_ties(region))
         g.elements += [
             svg.Line(x1=-1, x2=-1, y1=1, y2=61, class_=self._cols[0]),
             svg.Line(x1=2,  x2=2,  y1=1, y2=61, class_=self._cols[1]),
@@ -125,9 +196,14 @@ class BreadboardLayout:
 
         self.connected_groups: list[ConnectedGroup] = []
         self.grouping: dict[Connectable, ConnectedGroup] = {}
-        self.at_map: dict[Point, Tie] = {}
+        self.at_map: dict[Point, Tie] = {}          # free ties by position
         self.parts: dict[str, Component] = {}
         self.wires: list[Wire] = []
+        self.occupants: dict[Tie, Pin | Wire] = {}  # what is plugged into each used tie
+        self.seated: dict[Connectable, Tie] = {}    # which tie each placed pin sits in
+        self.occupied: dict[Point, Tie] = {}        # used ties by position, the complement of at_map
+        self._index: SpatialIndex[Component | Wire] | None = None
+        self.hash = 0       # zobrist hash of part placements, wires and their routes
 
         assert not set(picture) - set('|=')
         top_right = Point(0.5, 0.5)
@@ -142,7 +218,7 @@ class BreadboardLayout:
             part.set_transform(at=Point(top_right.x - tl.x, top_right.y - tl.y))
             tl, extent = part.viewbox()
             top_right = Point(tl.x + extent.x, tl.y)
-            self.parts[name] = part
+            self.add_part(part)
             rails = part.rails()
             self.connected_groups += rails
             self.grouping.update({
@@ -155,55 +231,295 @@ class BreadboardLayout:
         self.shape = Point(tl.x + extent.x + 0.5, tl.y + extent.y + 0.5)
 
     def __getattr__(self, name: str):
+        if name.startswith('__'):
+            raise AttributeError(name)
         return self.parts[name]
 
-    def place(self, *args: tuple[Connectable, Connectable]):
+    @staticmethod
+    def part_key(part: Component, at: Point, rotation: int) -> int:
+        return zobrist('part', part.name, float(at.x), float(at.y), rotation)
+
+    @staticmethod
+    def wire_key(wire: Wire) -> int:
+        (a, b) = wire.ends
+        return zobrist('wire', a.owner.name, a.name, b.owner.name, b.name, wire.color)
+
+    @staticmethod
+    def path_key(wire: Wire) -> int:
+        if not wire.path:
+            return 0
+        (a, b) = wire.ends
+        return zobrist('path', a.owner.name, a.name, b.owner.name, b.name, tuple(map(tuple, wire.path)))
+
+    def add_part(self, part: Component):
+        """Track a part, following its transform in the layout hash"""
+        if part.name in self.parts:
+            return
+        self.parts[part.name] = part
+        self.hash ^= self.part_key(part, part.at, part.rotation)
+        part.watchers.append(self.moved)
+
+    def remove_part(self, part: Component):
+        """Stop tracking a part, the inverse of add_part"""
+        del self.parts[part.name]
+        self.hash ^= self.part_key(part, part.at, part.rotation)
+        part.watchers.remove(self.moved)
+        self._index = None
+
+    def moved(self, part: Component, at: Point, rotation: int):
+        self._index = None
+        self.hash ^= self.part_key(part, at, rotation) ^ self.part_key(part, part.at, part.rotation)
+
+    def place(self, *args: tuple[Connectable | BlockInstance, Connectable]):
         for (pin, tie) in args:
+            if isinstance(pin, BlockInstance):
+                self.place_block(pin, cast(Tie, tie))
+                continue
             assert isinstance(pin, Pin) and isinstance(tie, Tie), \
                 "BreadboardLayout.place expected Pin @ Tie, not {pin} @ {tie}"
             # first position the part so it coincides with target tie
             dst = tie.at_global
             part = pin.owner
             src = pin.at_global
-            part.set_transform(at=Point(dst.x-src.x, dst.y-src.y))
+            at = part.at
+            part.set_transform(at=Point(part.at.x+dst.x-src.x, part.at.y+dst.y-src.y))
             # now check all pins match an available tie
-            for pin in part.connectables.values():
-                at = pin.at_global
-                tie = self.at_map[at]
-                group = self.grouping[tie]
-                group.connectables.append(pin)
-                self.grouping[pin] = group
-                del self.at_map[at]
-            self.parts[part.name] = part
-
-    def free_tie(self, group: ConnectedGroup, near: Connectable):
-        ties = [c for c in group.connectables if isinstance(c, Tie) and c.at_global in self.at_map]
+            try:
+                self.seat([(pin, pin.at_global) for pin in part.connectables.values()])
+            except KeyError:
+                part.set_transform(at=at)
+                raise
+            self.add_part(part)
+
+    def place_block(self, block: BlockInstance, tie: Tie):
+        """
+        Place a block instance with its origin at tie, and add its internal
+        wiring.  If either step fails the layout is left as it was
+        """
+        dst = tie.at_global
+        saved = {part: part.at for part in block.parts.values()}
+        n = len(self.wires)
+        block.move(dst)
+        try:
+            self.seat(block.footprint(dst))
+            self.wiring(*block.wires())
+        except (KeyError, ValueError):
+            for wire in self.wires[n:]:
+                self.unwire(wire)
+            for (part, at) in saved.items():
+                self.unseat(part)
+                part.set_transform(at=at)
+            raise
+        for part in block.parts.values():
+            self.add_part(part)
+
+    def seat(self, pins: Iterable[tuple[Pin, Point]]):
+        """Plug each pin into the free tie at the given position, or none if any tie isn't free"""
+        pins = list(pins)
+        taken = [at for (_, at) in pins if at not in self.at_map]
+        if taken:
+            raise KeyError(f"No free tie at {taken}")
+        self._index = None
+        for (pin, at) in pins:
+            tie = self.at_map[at]
+            group = self.grouping[tie]
+            group.connectables.append(pin)
+            self.grouping[pin] = group
+            self.occupy(tie, pin)
+            self.seated[pin] = tie
+
+    def unseat(self, part: Component):
+        """Pull a placed part's pins out of their ties, freeing them for reuse"""
+        self._index = None
+        for pin in part.connectables.values():
+            tie = self.seated.pop(pin, None)
+            if tie is None:
+                continue
+            self.grouping.pop(pin).connectables.remove(pin)
+            del self.occupants[tie]
+            at = tie.at_global
+            del self.occupied[at]
+            self.at_map[at] = tie
+
+    def occupy(self, tie: Tie, occupant: Pin | Wire):
+        at = tie.at_global
+        del self.at_map[at]
+        self.occupied[at] = tie
+        self.occupants[tie] = occupant
+
+    def occupant(self, tie: Tie) -> Pin | Wire | None:
+        """What is plugged into tie, if anything"""
+        return self.occupants.get(tie)
+
+    def tie_of(self, pin: Connectable) -> Tie | None:
+        """Which tie a placed pin sits in"""
+        return self.seated.get(pin)
+
+    def occupants_in(self, region: Box | str) -> dict[Tie, Pin | Wire]:
+        """All occupied ties within a (xmin, ymin), (width, height) region or named part, see region()"""
+        tl, extent = self.region(region)
+        br = Point(tl.x + extent.x, tl.y + extent.y)
+        xs, ys = range(ceil(tl.x), floor(br.x) + 1), range(ceil(tl.y), floor(br.y) + 1)
+        if len(xs) * len(ys) <= len(self.occupied):
+            # ties lie on the integer lattice, so probe each point in a small region
+            ties = [self.occupied.get(Point(x, y)) for y in ys for x in xs]
+        else:
+            ties = [
+                tie for (at, tie) in self.occupied.items()
+                if tl.x <= at.x <= br.x and tl.y <= at.y <= br.y
+            ]
+        return {tie: self.occupants[tie] for tie in ties if tie is not None}
+
+    def occupants_on(self, group: ConnectedGroup) -> dict[Tie, Pin | Wire]:
+        """All occupied ties in a connected group, e.g. a rail"""
+        return {
+            c: self.occupants[c] for c in group.connectables
+            if isinstance(c, Tie) and c in self.occupants
+        }
+
+    def free_tie(self, group: ConnectedGroup, near: Connectable, exclude: Connectable | None=None):
+        ties = [
+            c for c in group.connectables
+            if isinstance(c, Tie) and c.at_global in self.at_map and c is not exclude
+        ]
         return min(ties, key=lambda tie: distance(tie.at_global, near.at_global))
 
     def wiring(self, *wires: Wire, color=None):
+        self._index = None
         for wire in wires:
             (a, b) = wire.ends
             if a.at_global not in self.at_map:
                 a = self.free_tie(self.grouping[a], b)
-            if b.at_global not in self.at_map:
-                b = self.free_tie(self.grouping[b], a)
+            # the second end mustn't land in the tie chosen for the first
+            if b.at_global not in self.at_map or b.at_global == a.at_global:
+                b = self.free_tie(self.grouping[b], a, exclude=a)
+
+            self.add_wire(Wire(a, b, color or wire.color))
+
+    def add_wire(self, wire: Wire):
+        """Add a wire whose ends are both free ties, the inverse of unwire"""
+        self._index = None
+        for tie in cast(tuple[Tie, Tie], wire.ends):
+            self.occupy(tie, wire)
+        self.wires.append(wire)
+        self.hash ^= self.wire_key(wire) ^ self.path_key(wire)
+
+    def unwire(self, wire: Wire):
+        """Remove a wire, freeing the ties at its ends"""
+        self._index = None
+        self.wires.remove(wire)
+        self.hash ^= self.wire_key(wire) ^ self.path_key(wire)
+        for tie in cast(tuple[Tie, Tie], wire.ends):
+            del self.occupants[tie]
+            at = tie.at_global
+            del self.occupied[at]
+            self.at_map[at] = tie
+
+    def route(self, **kwargs) -> list[Wire]:
+        """
+        Route all wires around component bodies, see route.Router.
+        Returns any wires left unrouted, which are still drawn straight
+        """
+        obstacles = [
+            part for part in self.parts.values()
+            if not isinstance(part, BreadboardPart)
+        ]
+        self._index = None
+        for wire in self.wires:
+            self.hash ^= self.path_key(wire)
+        unrouted = Router(self.shape, obstacles, **kwargs).route(self.wires)
+        for wire in self.wires:
+            self.hash ^= self.path_key(wire)
+        return unrouted
+
+    def cut_list(self) -> Counter[tuple[str, int]]:
+        """Count of jumpers needed by (color, length in tie pitches)"""
+        return Counter((wire.color, ceil(wire.length)) for wire in self.wires)
+
+    def index(self) -> SpatialIndex[Component | Wire]:
+        """Spatial index of part and wire bounding boxes, rebuilt after any change"""
+        if self._index is None:
+            self._index = SpatialIndex()
+            for part in self.parts.values():
+                self._index.insert(part, part.viewbox())
+            for wire in self.wires:
+                self._index.insert(wire, wire.viewbox())
+        return self._index
+
+    def region(self, region: tuple[Point, Point] | str) -> tuple[Point, Point]:
+        """A (xmin, ymin), (width, height) region, given directly or as the name of a part"""
+        return self.parts[region].viewbox() if isinstance(region, str) else region
 
-            self.wires.append(Wire(a, b, color or wire.color))
+    def draw(self, workers: int | None=None, region: tuple[Point, Point] | str | None=None):
+        """
+        Draw all parts and wires, or only those overlapping region.
+        With `workers` each part is drawn and serialized in a separate
+        process, and the fragments are assembled in the original order,
+        giving the same svg as the serial path
+        """
+        parts: list[Component] = list(self.parts.values())
+        wires = self.wires
+        if region is not None:
+            region = self.region(region)
+            found = self.index().query(region)
+            parts = [x for x in found if isinstance(x, Component)]
+            wires = [x for x in found if isinstance(x, Wire)]
+        if not workers:
+            drawn = [part.draw(region) for part in parts]
+        else:
+            with ProcessPoolExecutor(workers) as pool:
+                drawn = list(pool.map(render_part, parts, repeat(region)))
+        # svg.py serializes any non-element child with str()
+        return svg.G(elements=cast(list[svg.Element], drawn + [
+            wire.draw() for wire in wires
+        ]))
 
-    def draw(self):
-        return svg.G(elements=[
-            part.draw() for part in self.parts.values()
-        ] + [
-            wire.draw() for wire in self.wires
-        ])
+    def to_html(self, fname: str, css='style.css'):
+        """
+        Write the layout as a standalone html page which draws it on a
+        canvas, for layouts too large to pan and zoom smoothly as svg
+        """
+        canvas = Canvas()
+        for part in self.parts.values():
+            part.paint(canvas)
+        for wire in self.wires:
+            canvas.polyline([['wire']], list(wire.path or wire.pts), wire.color)
+        canvas.to_html(fname, self.shape, css, title=fname.rsplit('.', 1)[0])
 
-    def to_svg(self, fname: str, css='style.css'):
+    def to_svg(
+            self,
+            fname: str,
+            css='style.css',
+            precision: int | None=None,
+            compress: bool | None=None,
+            workers: int | None=None,
+            region: tuple[Point, Point] | str | None=None
+    ):
+        """
+        Write the layout as svg, optionally rounding coordinates to
+        `precision` decimal places.  The output is gzipped when
+        `compress` is set, or by default when fname ends with .svgz.
+        Parts are drawn in parallel if `workers` is given, and a `region`
+        or part name limits the output to that area, see draw()
+        """
+        tl, extent = self.region(region) if region is not None else (Point(), self.shape)
         canvas = svg.SVG(
-            width=self.shape.x*10, height=self.shape.y*10,
-            viewBox=svg.ViewBoxSpec(0, 0, self.shape.x, self.shape.y),
+            width=extent.x*10, height=extent.y*10,
+            viewBox=svg.ViewBoxSpec(tl.x, tl.y, extent.x, extent.y),
             elements=[
                 svg.Style(text=open(css).read()),
-                self.draw()
+                self.draw(workers, region)
             ]
         )
-        open(fname, 'w').write(str(canvas))
+        text = str(canvas)
+        if precision is not None:
+            text = round_attributes(text, precision)
+        if compress is None:
+            compress = fname.endswith('.svgz')
+        if compress:
+            # fixed mtime so identical layouts give identical archives
+            with open(fname, 'wb') as f:
+                f.write(gzip.compress(text.encode('utf-8'), mtime=0))
+        else:
+            with open(fname, 'w') as f:
+                f.write(text)
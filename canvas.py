@@ -0,0 +1,241 @@
+import json
+from array import array
+from base64 import b64encode
+from typing import Any, TYPE_CHECKING
+
+from connect import Point
+
+if TYPE_CHECKING:
+    from component import Component
+
+
+class Canvas:
+    """
+    Collects layout geometry as flat coordinate arrays, grouped into layers
+    that share the same svg classes, and writes it out as a standalone html
+    page which draws it on a canvas.  Styles come from the usual css,
+    read back from one hidden probe element per layer, so the page's DOM
+    stays the same size however many ties the layout has.
+
+    Classes are given as a list of class lists, from the outermost group
+    down to the element itself, mirroring the structure of the svg.
+    """
+    def __init__(self):
+        self.layers: dict[tuple, dict[str, Any]] = {}
+
+    def layer(self, kind: str, tag: str, classes: list[list[str]]) -> dict[str, Any]:
+        key = (kind, tag, tuple(tuple(c) for c in classes))
+        if key not in self.layers:
+            self.layers[key] = dict(kind=kind, tag=tag, classes=classes, data=[], text=[], offsets=[], colors=[])
+        return self.layers[key]
+
+    def rect(self, part: 'Component', classes: list[list[str]], x: float, y: float, width: float, height: float):
+        """Add a rectangle given in the part's local coordinates"""
+        p, q = part.transform(Point(x, y)), part.transform(Point(x + width, y + height))
+        self.layer('rect', 'rect', classes)['data'] += [
+            min(p.x, q.x), min(p.y, q.y), abs(q.x - p.x), abs(q.y - p.y)
+        ]
+
+    def line(self, part: 'Component', classes: list[list[str]], x1: float, y1: float, x2: float, y2: float):
+        p, q = part.transform(Point(x1, y1)), part.transform(Point(x2, y2))
+        self.layer('line', 'line', classes)['data'] += [p.x, p.y, q.x, q.y]
+
+    def arc(self, part: 'Component', classes: list[list[str]], x: float, y: float, r: float):
+        """Add a half disc centred on a local point, bulging towards the part's +y"""
+        p = part.transform(Point(x, y))
+        self.layer('arc', 'path', classes)['data'] += [p.x, p.y, r, part.rotation]
+
+    def text(self, part: 'Component', classes: list[list[str]], x: float, y: float, text: str):
+        p = part.transform(Point(x, y))
+        layer = self.layer('text', 'text', classes)
+        layer['data'] += [p.x, p.y]
+        layer['text'].append(text)
+
+    def polyline(self, classes: list[list[str]], pts: list[Point], color: str):
+        """Add a polyline in global coordinates with its own stroke colour"""
+        layer = self.layer('poly', 'polyline', classes)
+        layer['offsets'].append(len(layer['data']))
+        layer['data'] += [v for p in pts for v in p]
+        layer['colors'].append(color)
+
+    def encode(self) -> list[dict[str, Any]]:
+        return [
+            dict(
+                kind=layer['kind'],
+                tag=layer['tag'],
+                classes=layer['classes'],
+                data=b64encode(array('f', layer['data']).tobytes()).decode('ascii'),
+                offsets=b64encode(array('I', layer['offsets']).tobytes()).decode('ascii'),
+                text=layer['text'],
+                colors=layer['colors'],
+            )
+            for layer in self.layers.values()
+        ]
+
+    def to_html(self, fname: str, shape: Point, css='style.css', title='layout'):
+        data = json.dumps(dict(shape=shape, layers=self.encode())).replace('</', '<\\/')
+        page = _page.format(title=title, css=open(css).read(), data=data, script=_script)
+        with open(fname, 'w') as f:
+            f.write(page)
+
+
+_page = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+html, body {{ margin: 0; height: 100%; overflow: hidden; background: white; }}
+canvas {{ display: block; width: 100%; height: 100%; cursor: grab; }}
+#probes {{ position: absolute; width: 0; height: 0; visibility: hidden; }}
+{css}
+</style>
+</head>
+<body>
+<canvas id="layout"></canvas>
+<svg id="probes" xmlns="http://www.w3.org/2000/svg"></svg>
+<script>
+const layout = {data};
+{script}
+</script>
+</body>
+</html>
+"""
+
+
+# pan by dragging, zoom with the wheel, double click to fit
+_script = """
+(function () {
+  const svgns = 'http://www.w3.org/2000/svg';
+  const canvas = document.getElementById('layout');
+  const ctx = canvas.getContext('2d');
+  const probes = document.getElementById('probes');
+
+  function decode(s, type) {
+    const bytes = Uint8Array.from(atob(s), c => c.charCodeAt(0));
+    return new type(bytes.buffer);
+  }
+
+  function probe(classes, tag) {
+    let el = probes;
+    classes.forEach((cls, i) => {
+      const child = document.createElementNS(svgns, i < classes.length - 1 ? 'g' : tag);
+      child.setAttribute('class', cls.join(' '));
+      el.appendChild(child);
+      el = child;
+    });
+    if (tag === 'text') el.textContent = 'x';
+    const s = getComputedStyle(el);
+    return {
+      fill: s.fill === 'none' ? null : s.fill,
+      stroke: s.stroke === 'none' ? null : s.stroke,
+      width: parseFloat(s.strokeWidth) || 1,
+      cap: s.strokeLinecap || 'butt',
+      join: s.strokeLinejoin || 'miter',
+      font: (parseFloat(s.fontSize) || 0.6) + 'px ' + s.fontFamily,
+      size: parseFloat(s.fontSize) || 0.6,
+      align: {start: 'left', middle: 'center', end: 'right'}[s.textAnchor] || 'left',
+    };
+  }
+
+  const layers = layout.layers.map(layer => Object.assign({}, layer, {
+    data: decode(layer.data, Float32Array),
+    offsets: decode(layer.offsets, Uint32Array),
+    style: probe(layer.classes, layer.tag),
+  }));
+
+  let scale = 1, tx = 0, ty = 0;
+
+  function fit() {
+    const w = canvas.clientWidth, h = canvas.clientHeight;
+    scale = Math.min(w / layout.shape[0], h / layout.shape[1]);
+    tx = (w - scale * layout.shape[0]) / 2;
+    ty = (h - scale * layout.shape[1]) / 2;
+  }
+
+  function paint(layer) {
+    const s = layer.style, d = layer.data;
+    ctx.lineWidth = s.width;
+    ctx.lineCap = s.cap;
+    ctx.lineJoin = s.join;
+    ctx.fillStyle = s.fill || 'black';
+    ctx.strokeStyle = s.stroke || 'black';
+    if (layer.kind === 'text') {
+      if (s.size * scale < 3) return;     // too small to read
+      ctx.font = s.font;
+      ctx.textAlign = s.align;
+      ctx.textBaseline = 'middle';
+      for (let i = 0; i < layer.text.length; i++) {
+        if (s.fill) ctx.fillText(layer.text[i], d[2*i], d[2*i+1]);
+      }
+      return;
+    }
+    if (layer.kind === 'poly') {
+      for (let i = 0; i < layer.offsets.length; i++) {
+        const end = i + 1 < layer.offsets.length ? layer.offsets[i+1] : d.length;
+        ctx.beginPath();
+        for (let j = layer.offsets[i]; j < end; j += 2) {
+          j === layer.offsets[i] ? ctx.moveTo(d[j], d[j+1]) : ctx.lineTo(d[j], d[j+1]);
+        }
+        ctx.strokeStyle = layer.colors[i];
+        ctx.stroke();
+      }
+      return;
+    }
+    ctx.beginPath();
+    if (layer.kind === 'rect') {
+      for (let i = 0; i < d.length; i += 4) ctx.rect(d[i], d[i+1], d[i+2], d[i+3]);
+    } else if (layer.kind === 'line') {
+      for (let i = 0; i < d.length; i += 4) { ctx.moveTo(d[i], d[i+1]); ctx.lineTo(d[i+2], d[i+3]); }
+    } else if (layer.kind === 'arc') {
+      for (let i = 0; i < d.length; i += 4) {
+        const a = d[i+3] * Math.PI / 180;
+        ctx.moveTo(d[i] + d[i+2] * Math.cos(a), d[i+1] + d[i+2] * Math.sin(a));
+        ctx.arc(d[i], d[i+1], d[i+2], a, a + Math.PI);
+        ctx.closePath();
+      }
+    }
+    if (s.fill && layer.kind !== 'line') ctx.fill();
+    if (s.stroke) ctx.stroke();
+  }
+
+  let pending = false;
+  function draw() {
+    pending = false;
+    const dpr = window.devicePixelRatio || 1;
+    canvas.width = canvas.clientWidth * dpr;
+    canvas.height = canvas.clientHeight * dpr;
+    ctx.setTransform(dpr * scale, 0, 0, dpr * scale, dpr * tx, dpr * ty);
+    layers.forEach(paint);
+  }
+  function redraw() {
+    if (!pending) { pending = true; requestAnimationFrame(draw); }
+  }
+
+  let drag = null;
+  canvas.addEventListener('pointerdown', e => {
+    drag = {x: e.clientX - tx, y: e.clientY - ty};
+    canvas.setPointerCapture(e.pointerId);
+  });
+  canvas.addEventListener('pointermove', e => {
+    if (!drag) return;
+    tx = e.clientX - drag.x;
+    ty = e.clientY - drag.y;
+    redraw();
+  });
+  canvas.addEventListener('pointerup', () => { drag = null; });
+  canvas.addEventListener('wheel', e => {
+    e.preventDefault();
+    const k = Math.exp(-e.deltaY / 500);
+    tx = e.offsetX - k * (e.offsetX - tx);
+    ty = e.offsetY - k * (e.offsetY - ty);
+    scale *= k;
+    redraw();
+  }, {passive: false});
+  canvas.addEventListener('dblclick', () => { fit(); redraw(); });
+  window.addEventListener('resize', redraw);
+
+  fit();
+  draw();
+})();
+"""
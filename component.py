@@ -1,8 +1,12 @@
-from typing_extensions import overload
+from typing_extensions import overload, Self
+from copy import copy
+from typing import Callable
+from dataclasses import replace
 import svg
 import re
 
 from connect import Connectable, Point
+from canvas import Canvas
 
 
 class Component:
@@ -25,6 +29,12 @@ class Component:
         self.description = description
         self.tags = tags
         self.connectables: dict[str, Connectable] = {}
+        # called with the old position and rotation whenever the transform changes
+        self.watchers: list[Callable[[Self, Point, int], None]] = []
+
+    def __getstate__(self):
+        # watchers belong to whoever is tracking this copy, not to clones or pickles
+        return {**self.__dict__, 'watchers': []}
 
     @classmethod
     def register(cls, name, **kwargs):
@@ -45,6 +55,9 @@ class Component:
 
     def __getattr__(self, name: str) -> Connectable:
         """Get a connectable by name"""
+        if name.startswith('__'):
+            # don't shadow protocol lookups, e.g. __setstate__ when unpickling
+            raise AttributeError(name)
         return self.connectables[name]
 
     def default_connectable(self):
@@ -106,14 +119,27 @@ class Component:
 
         return [self[i] for i in ks]
 
+    def clone(self, name: str) -> Self:
+        """A copy of this component with its own name and connectables"""
+        part = copy(self)
+        part.name = name
+        part.connectables = {
+            k: replace(c, owner=part) for (k, c) in self.connectables.items()
+        }
+        return part
+
     def __matmul__(self, tie: Connectable):
         return (self.default_connectable(), tie)
 
     def set_transform(self, at: Point|None=None, rotation: int|None=None):
+        old = (self.at, self.rotation)
         if at is not None:
             self.at = at
         if rotation is not None:
             self.rotation = rotation
+        if (self.at, self.rotation) != old:
+            for watch in self.watchers:
+                watch(self, *old)
 
     def flipped(self):
        self.set_transform(self.at, 180)
@@ -133,19 +159,42 @@ class Component:
                 raise ValueError("only 90 deg rotations are implemented")
         return Point(self.at.x + q.x, self.at.y + q.y)
 
-    def viewbox(self):     # xmin, xmax, ymin, ymax
+    def viewbox(self):     # (xmin, ymin), (width, height) allowing for rotation
+        corners = [
+            self.transform(Point(x, y))
+            for x in (-self.padding.x, self.shape.x + self.padding.x)
+            for y in (-self.padding.y, self.shape.y + self.padding.y)
+        ]
+        xs, ys = [p.x for p in corners], [p.y for p in corners]
+        return (
+            Point(min(xs), min(ys)),
+            Point(max(xs) - min(xs), max(ys) - min(ys))
+        )
+
+    def visible(self, p: Point, region: tuple[Point, Point] | None, margin=0.5) -> bool:
+        """Whether local point p lies within margin of the (xmin, ymin), (width, height) region"""
+        if region is None:
+            return True
+        q = self.transform(p)
+        tl, extent = region
         return (
-            Point(
-                self.at.x - self.padding.x,
-                self.at.y - self.padding.y,
-            ),
-            Point(
-                self.shape.x + 2*self.padding.x,
-                self.shape.y + 2*self.padding.y,
-            )
+            tl.x - margin <= q.x <= tl.x + extent.x + margin
+            and tl.y - margin <= q.y <= tl.y + extent.y + margin
+        )
+
+    def kind(self) -> list[str]:
+        return ['component', self.__class__.__name__.lower()]
+
+    def paint(self, canvas: Canvas):
+        """Add the component's geometry to a canvas, see draw()"""
+        canvas.rect(
+            self, [self.kind(), []],
+            -self.padding.x, -self.padding.y,
+            self.shape.x + 2*self.padding.x, self.shape.y + 2*self.padding.y
         )
 
-    def draw(self):
+    def draw(self, region: tuple[Point, Point] | None=None):
+        """Draw the component, optionally omitting details outside region"""
         t = [svg.Translate(self.at.x, self.at.y)]
         if self.rotation:
             t.append(svg.Rotate(self.rotation))
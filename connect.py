@@ -12,11 +12,22 @@ if TYPE_CHECKING:
 
 Point = namedtuple('Point', ('x', 'y'), defaults=(0, 0))
 
+Box = tuple[Point, Point]      # (xmin, ymin), (width, height) as from Component.viewbox
+
 
 def distance(p: Point, q: Point):
     return sqrt(pow(p.x-q.x, 2) + pow(p.y-q.y, 2))
 
 
+def overlaps(a: Box, b: Box) -> bool:
+    """Whether two (xmin, ymin), (width, height) boxes intersect, boxes which only touch don't"""
+    (atl, aext), (btl, bext) = a, b
+    return (
+        atl.x < btl.x + bext.x and btl.x < atl.x + aext.x
+        and atl.y < btl.y + bext.y and btl.y < atl.y + aext.y
+    )
+
+
 @dataclass(frozen=True)
 class Connectable:
     owner: 'Component'
@@ -58,12 +69,34 @@ class Wire:
         self.color = color
         self.ends = (a, b)
         self.pts = a.at_global, b.at_global
+        self.path: list[Point] | None = None     # corner points once routed
 
     @staticmethod
     def zip(starts: list[Connectable], ends: list[Connectable], **kwargs):
         return [Wire(a, b, **kwargs) for (a,b) in zip(starts, ends)]
 
+    @property
+    def length(self) -> float:
+        """Length of the jumper in tie pitches, following the routed path if any"""
+        pts = self.path or self.pts
+        return sum(distance(p, q) for (p, q) in zip(pts, pts[1:]))
+
+    def viewbox(self):     # (xmin, ymin), (width, height) including the stroke
+        pts = self.path or self.pts
+        xs, ys = [p.x for p in pts], [p.y for p in pts]
+        r = 0.15
+        return (
+            Point(min(xs) - r, min(ys) - r),
+            Point(max(xs) - min(xs) + 2*r, max(ys) - min(ys) + 2*r)
+        )
+
     def draw(self):
+        if self.path:
+            return svg.Polyline(
+                points=[v for p in self.path for v in p],
+                stroke=self.color,
+                class_=['wire']
+            )
         p1, p2 = self.pts
         return svg.Line(x1=p1.x, y1=p1.y, x2=p2.x, y2=p2.y, stroke=self.color, class_=['wire'])
 
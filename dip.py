@@ -1,6 +1,7 @@
 import svg
 from typing import cast, overload
 
+from canvas import Canvas
 from component import Component
 from connect import Point, Connectable, Pin
 
@@ -47,8 +48,20 @@ class DIP(Component):
     def default_connectable(self):
         return self[1 if self.rotation != 180 else self.shape.y+2]
 
-    def draw(self):
-        g = super().draw()
+    def paint(self, canvas: Canvas):
+        super().paint(canvas)
+        canvas.arc(self, [self.kind(), ['polarity-mark']], self.shape.x/2, -self.padding.y, 1/2)
+        for pin in self.connectables.values():
+            x, y = pin.at_local
+            side = 'rhs' if x else 'lhs'
+            canvas.rect(self, [self.kind(), ['pins', side], [], []], x if x else x-0.1, y-0.2, 0.1, 0.4)
+            canvas.text(
+                self, [self.kind(), ['pins', side], [], []],
+                x-0.2 if x else x+0.2, y, cast(Pin, pin).symbol
+            )
+
+    def draw(self, region: tuple[Point, Point] | None=None):
+        g = super().draw(region)
         g.elements.append(
             svg.Path(class_='polarity-mark', d=[
                 svg.MoveTo(x=(self.shape.x-1)/2, y=-self.padding.y),
@@ -56,20 +69,26 @@ class DIP(Component):
                 svg.ClosePath()
             ])
         )
+        # pins are grouped by side so the shared classes appear once per side
         g.elements += [
             svg.G(
-                class_='pin',
-                transform=[svg.Translate(pin.at_local.x, pin.at_local.y)],
+                class_=['pins', side],
                 elements=[
-                    svg.Rect(x=0 if pin.at_local.x else -0.1, y=-0.2, width=0.1, height=0.4),
-                    svg.Text(
-                        text=cast(Pin, pin).symbol,
-                        class_=['rhs' if pin.at_local.x else 'lhs'],
-                        dx=-0.2 if pin.at_local.x else 0.2,
+                    svg.G(
+                        transform=[svg.Translate(pin.at_local.x, pin.at_local.y)],
+                        elements=[
+                            svg.Rect(x=0 if pin.at_local.x else -0.1, y=-0.2, width=0.1, height=0.4),
+                            svg.Text(
+                                text=cast(Pin, pin).symbol,
+                                dx=-0.2 if pin.at_local.x else 0.2,
+                            )
+                        ]
                     )
+                    for pin in self.connectables.values()
+                    if bool(pin.at_local.x) == (side == 'rhs')
                 ]
             )
-            for pin in self.connectables.values()
+            for side in ('lhs', 'rhs')
         ]
         return g
 
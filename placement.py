@@ -0,0 +1,310 @@
+from collections import defaultdict
+from dataclasses import dataclass
+from math import floor
+from typing import TYPE_CHECKING, cast
+
+from component import Component
+from connect import Point, Box, Connectable, Tie, Pin, Wire, overlaps
+
+if TYPE_CHECKING:
+    from breadboard import BreadboardLayout
+
+
+@dataclass(eq=False)
+class Constraint:
+    """A relation which must hold for part's position, usually relative to another part"""
+    part: Component
+
+    def refs(self) -> list[Component]:
+        """Parts which must be positioned before this constraint can be applied"""
+        return []
+
+    def target(self, extent: Point) -> tuple[float | None, float | None]:
+        """Preferred top left corner of part's viewbox, either coordinate may be unspecified"""
+        return (None, None)
+
+    def hint(self) -> Point | None:
+        """Somewhere to start looking when no constraint has a target"""
+        return None
+
+    def ok(self, box: Box, ties: list[Tie]) -> bool:
+        """Whether part's viewbox and the ties its pins would occupy are acceptable"""
+        return True
+
+
+@dataclass(eq=False)
+class Below(Constraint):
+    ref: Component
+    gap: float = 0
+
+    def refs(self):
+        return [self.ref]
+
+    def target(self, extent):
+        tl, ext = self.ref.viewbox()
+        return (tl.x, tl.y + ext.y + self.gap)
+
+    def ok(self, box, ties):
+        tl, ext = self.ref.viewbox()
+        return box[0].y >= tl.y + ext.y + self.gap
+
+
+@dataclass(eq=False)
+class RightOf(Constraint):
+    ref: Component
+    gap: float = 0
+
+    def refs(self):
+        return [self.ref]
+
+    def target(self, extent):
+        tl, ext = self.ref.viewbox()
+        return (tl.x + ext.x + self.gap, tl.y)
+
+    def ok(self, box, ties):
+        tl, ext = self.ref.viewbox()
+        return box[0].x >= tl.x + ext.x + self.gap
+
+
+@dataclass(eq=False)
+class SameRow(Constraint):
+    """Align the top of part with the top of ref"""
+    ref: Component
+
+    def refs(self):
+        return [self.ref]
+
+    def target(self, extent):
+        return (None, self.ref.viewbox()[0].y)
+
+    def ok(self, box, ties):
+        return box[0].y == self.ref.viewbox()[0].y
+
+
+@dataclass(eq=False)
+class MinGap(Constraint):
+    """Keep at least gap between the viewboxes of part and ref"""
+    ref: Component
+    gap: float = 1
+
+    def refs(self):
+        return [self.ref]
+
+    def ok(self, box, ties):
+        tl, ext = self.ref.viewbox()
+        padded = (Point(tl.x - self.gap, tl.y - self.gap), Point(ext.x + 2*self.gap, ext.y + 2*self.gap))
+        return not overlaps(box, padded)
+
+
+@dataclass(eq=False)
+class OnBoard(Constraint):
+    """Plug every pin of part into ties of the given breadboard"""
+    board: Component
+
+    def hint(self):
+        return self.board.viewbox()[0]
+
+    def ok(self, box, ties):
+        return all(tie.owner is self.board for tie in ties)
+
+
+_spiral: list[tuple[int, int]] = []
+
+
+def spiral(radius: int) -> list[tuple[int, int]]:
+    """Integer offsets within radius of the origin, nearest first"""
+    global _spiral
+    if not _spiral or max(_spiral[-1]) < radius:
+        _spiral = sorted(
+            ((dx, dy) for dx in range(-radius, radius+1) for dy in range(-radius, radius+1)),
+            key=lambda d: (d[0]*d[0] + d[1]*d[1], d)
+        )
+    return _spiral
+
+
+class Solver:
+    """
+    Positions parts on a layout from relative constraints, choosing for each
+    the legal position nearest to where its constraints would put it.
+
+    Parts are solved after the parts they refer to.  Each edit marks the
+    parts it touches as dirty, and solve() only moves those and the parts
+    which depend on them, leaving everything else seated in the layout.
+    Wires plugged into the same rows as a moved part's pins are rewired to
+    follow those pins, picking free ties as BreadboardLayout.wiring does.
+    """
+    def __init__(self, layout: 'BreadboardLayout'):
+        self.layout = layout
+        self.constraints: dict[Component, list[Constraint]] = defaultdict(list)
+        self.dependents: dict[Component, set[Component]] = defaultdict(set)
+        self.dirty: set[Component] = set()
+        self.moves: list[tuple] = []
+
+    def add(self, *constraints: Constraint):
+        for c in constraints:
+            self.constraints[c.part].append(c)
+            for ref in c.refs():
+                self.dependents[ref].add(c.part)
+            self.dirty.add(c.part)
+
+    def remove(self, *constraints: Constraint):
+        for c in constraints:
+            self.constraints[c.part].remove(c)
+            for ref in c.refs():
+                if not any(ref in other.refs() for other in self.constraints[c.part]):
+                    self.dependents[ref].discard(c.part)
+            self.dirty.add(c.part)
+
+    def place(self, *args: tuple):
+        """Move fixed parts with pin @ tie, as for BreadboardLayout.place, at the next solve"""
+        for (pin, tie) in args:
+            self.moves.append((pin, tie))
+            self.dirty |= self.dependents[pin.owner]
+
+    def affected(self) -> list[Component]:
+        """The dirty parts and everything depending on them, refs before dependents"""
+        todo = list(self.dirty)
+        found = set()
+        while todo:
+            part = todo.pop()
+            if part not in found and self.constraints[part]:
+                found.add(part)
+                todo += self.dependents[part]
+
+        order: list[Component] = []
+        state: dict[Component, int] = {}        # 1 while visiting, 2 when done
+
+        def visit(part: Component):
+            if state.get(part) == 2:
+                return
+            if state.get(part) == 1:
+                raise ValueError(f"Placement constraints on {part.name} are circular")
+            state[part] = 1
+            for c in self.constraints[part]:
+                for ref in c.refs():
+                    if ref in found:
+                        visit(ref)
+            state[part] = 2
+            order.append(part)
+
+        for part in self.constraints:       # in the order constraints were added
+            if part in found:
+                visit(part)
+        return order
+
+    def solve(self) -> list[Component]:
+        """
+        Apply pending moves and reposition the parts affected by edits since
+        the last solve, returning them.  If any part can't be placed, or a
+        wire can't follow it, the layout is restored as it was and the edits
+        stay pending.
+        """
+        layout = self.layout
+        moved = [pin.owner for (pin, _) in self.moves]
+        order = [part for part in self.affected() if part not in moved]
+        touched = moved + order
+        saved = {
+            part: (part.at, part.rotation, [
+                (pin, tie.at_global) for pin in part.connectables.values()
+                if (tie := layout.tie_of(pin)) is not None
+            ])
+            for part in touched
+        }
+        added = [part for part in touched if part.name not in layout.parts]
+        wires = list(layout.wires)
+        attached = self.attached(touched)
+        for (wire, _) in attached:
+            layout.unwire(wire)
+        kept = len(layout.wires)
+        for part in touched:
+            layout.unseat(part)
+        try:
+            layout.place(*self.moves)
+            for part in order:
+                self.put(part)
+            for (wire, ends) in attached:
+                layout.wiring(Wire(*ends, wire.color))
+        except (KeyError, ValueError):
+            for wire in layout.wires[kept:]:
+                layout.unwire(wire)
+            for part in touched:
+                layout.unseat(part)
+            for part in added:
+                if part.name in layout.parts:
+                    layout.remove_part(part)
+            for (part, (at, rotation, pins)) in saved.items():
+                part.set_transform(at=at, rotation=rotation)
+                layout.seat(pins)
+            for (wire, _) in attached:
+                layout.add_wire(wire)
+            layout.wires[:] = wires
+            raise
+        self.moves.clear()
+        self.dirty.clear()
+        return order
+
+    def attached(self, parts: list[Component]) -> list[tuple[Wire, list[Connectable]]]:
+        """
+        Wires plugged into the rows of the seated pins of parts, each with
+        its ends, where an end in such a row is replaced by the pin it follows
+        """
+        follow: dict[Tie, Pin] = {}
+        for part in parts:
+            for pin in part.connectables.values():
+                if self.layout.tie_of(pin) is None:
+                    continue
+                for c in self.layout.grouping[pin].connectables:
+                    if isinstance(c, Tie) and isinstance(self.layout.occupants.get(c), Wire):
+                        follow.setdefault(c, cast(Pin, pin))
+        return [
+            (wire, [follow.get(cast(Tie, end), end) for end in wire.ends])
+            for wire in self.layout.wires
+            if any(end in follow for end in wire.ends)
+        ]
+
+    def isolated(self, ties: list[Tie]) -> bool:
+        """Whether each tie is on a separate connected group with no pins plugged in yet"""
+        groups = [self.layout.grouping[tie] for tie in ties]
+        return (
+            len({id(g) for g in groups}) == len(groups)
+            and not any(isinstance(c, Pin) for g in groups for c in g.connectables)
+        )
+
+    def put(self, part: Component):
+        constraints = self.constraints[part]
+        at_map = self.layout.at_map
+        pin = part.default_connectable()
+        pins = [
+            (p.at_global.x - part.at.x, p.at_global.y - part.at.y)
+            for p in part.connectables.values()
+        ]
+        first = (pin.at_global.x - part.at.x, pin.at_global.y - part.at.y)
+        tl, extent = part.viewbox()
+        inset = (tl.x - part.at.x, tl.y - part.at.y)
+
+        xs, ys = [], []
+        for c in constraints:
+            x, y = c.target(extent)
+            if x is not None:
+                xs.append(x)
+            if y is not None:
+                ys.append(y)
+        hint = next((h for c in constraints if (h := c.hint())), None) or tl
+        ideal = Point(
+            round((sum(xs)/len(xs) if xs else hint.x) - inset[0]),
+            round((sum(ys)/len(ys) if ys else hint.y) - inset[1]),
+        )
+
+        radius = floor(max(self.layout.shape))
+        for (dx, dy) in spiral(radius):
+            x, y = ideal.x + dx, ideal.y + dy
+            if Point(x + first[0], y + first[1]) not in at_map:
+                continue
+            ties = [at_map.get(Point(x + px, y + py)) for (px, py) in pins]
+            if None in ties or not self.isolated(cast(list[Tie], ties)):
+                continue
+            box = (Point(x + inset[0], y + inset[1]), extent)
+            if all(c.ok(box, ties) for c in constraints):
+                self.layout.place((pin, at_map[Point(x + first[0], y + first[1])]))
+                return
+        raise ValueError(f"No legal position for {part.name}")
@@ -0,0 +1,151 @@
+from heapq import heappush, heappop
+from math import ceil, floor
+
+from component import Component
+from connect import Point, Wire
+
+
+_steps = ((1, 0), (0, 1), (-1, 0), (0, -1))     # E, S, W, N
+
+
+class Router:
+    """
+    Route wires as rectilinear paths on the integer tie lattice using A*.
+
+    Cells under component bodies are blocked, other than the body a
+    wire's own end sits beneath, and each path pays extra
+    for every bend and for every cell it shares with another wire.
+    Wires are routed together: any that still cross are ripped up and
+    rerouted with a growing history cost on the contested cells.
+
+    The search arrays are allocated once per router and reused between
+    wires, with a generation stamp standing in for clearing them.
+    """
+    def __init__(
+            self,
+            shape: Point,
+            obstacles: list[Component],
+            bend: float = 2,
+            crossing: float = 8,
+    ):
+        self.width = ceil(shape.x)
+        self.height = ceil(shape.y)
+        self.bend = bend
+        self.crossing = crossing
+        n = self.width * self.height
+        self.blocked = [0] * n          # 1 + index of the covering obstacle
+        for (i, part) in enumerate(obstacles):
+            tl, extent = part.viewbox()
+            for y in range(max(0, ceil(tl.y)), min(self.height, floor(tl.y + extent.y) + 1)):
+                for x in range(max(0, ceil(tl.x)), min(self.width, floor(tl.x + extent.x) + 1)):
+                    self.blocked[y*self.width + x] = i + 1
+        self.usage = [0] * n
+        self.history = [0.0] * n
+        self.paths: dict[Wire, list[int]] = {}
+        # per-state search arrays, state = cell * 4 + direction
+        self.generation = 0
+        self.seen = [0] * (4*n)
+        self.cost = [0.0] * (4*n)
+        self.came = [0] * (4*n)
+
+    def cell(self, p: Point) -> int:
+        return round(p.y) * self.width + round(p.x)
+
+    def point(self, cell: int) -> Point:
+        return Point(*reversed(divmod(cell, self.width)))
+
+    def search(self, start: int, goal: int) -> list[int] | None:
+        """Cheapest path of cells from start to goal, or None if unreachable"""
+        w, h = self.width, self.height
+        gx, gy = goal % w, goal // w
+        self.generation += 1
+        gen = self.generation
+        seen, cost, came = self.seen, self.cost, self.came
+        # a wire may still pass through the bodies its own ends lie under
+        exits = {0, self.blocked[start], self.blocked[goal]}
+
+        heap: list[tuple[float, float, int]] = []
+        x, y = start % w, start // w
+        for d in range(4):
+            s = start*4 + d
+            seen[s], cost[s], came[s] = gen, 0, -1
+            heappush(heap, (abs(gx-x) + abs(gy-y), 0, s))
+
+        while heap:
+            _, g, s = heappop(heap)
+            if g > cost[s]:
+                continue            # stale entry
+            c, d = divmod(s, 4)
+            if c == goal:
+                path = []
+                while s != -1:
+                    path.append(s // 4)
+                    s = came[s]
+                return path[::-1]
+            x, y = c % w, c // w
+            for nd, (dx, dy) in enumerate(_steps):
+                if nd == (d + 2) % 4:
+                    continue
+                nx, ny = x + dx, y + dy
+                if not (0 <= nx < w and 0 <= ny < h):
+                    continue
+                nc = ny*w + nx
+                if self.blocked[nc] not in exits:
+                    continue
+                ng = g + 1 + self.crossing * self.usage[nc] + self.history[nc]
+                if nd != d:
+                    ng += self.bend
+                t = nc*4 + nd
+                if seen[t] == gen and cost[t] <= ng:
+                    continue
+                seen[t], cost[t], came[t] = gen, ng, s
+                heappush(heap, (ng + abs(gx-nx) + abs(gy-ny), ng, t))
+        return None
+
+    def add(self, wire: Wire) -> bool:
+        a, b = wire.pts
+        path = self.search(self.cell(a), self.cell(b))
+        if path is None:
+            return False
+        for c in path:
+            self.usage[c] += 1
+        self.paths[wire] = path
+        return True
+
+    def remove(self, wire: Wire):
+        for c in self.paths.pop(wire):
+            self.usage[c] -= 1
+
+    def crossings(self, wire: Wire) -> list[int]:
+        return [c for c in self.paths[wire] if self.usage[c] > 1]
+
+    def route(self, wires: list[Wire], passes: int = 4) -> list[Wire]:
+        """
+        Route all wires, setting each wire's path to its corner points.
+        Returns the wires that could not be routed, which keep no path
+        and are drawn straight.
+        """
+        unrouted = [wire for wire in wires if not self.add(wire)]
+        for _ in range(passes):
+            congested = [wire for wire in self.paths if self.crossings(wire)]
+            if not congested:
+                break
+            for wire in congested:
+                for c in self.crossings(wire):
+                    self.history[c] += 1
+                self.remove(wire)
+                if not self.add(wire):
+                    unrouted.append(wire)
+
+        for wire in wires:
+            path = self.paths.get(wire)
+            wire.path = path and self.corners(path)
+        return unrouted
+
+    def corners(self, path: list[int]) -> list[Point]:
+        """Reduce a path of cells to its end and bend points"""
+        keep = [path[0]] + [
+            c for (p, c, n) in zip(path, path[1:], path[2:])
+            if c - p != n - c
+        ] + [path[-1]]
+        return [self.point(c) for c in keep]
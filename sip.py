@@ -1,5 +1,6 @@
 import svg
 from typing import Literal, cast
+from canvas import Canvas
 from component import Component
 from connect import Point, Pin
 
@@ -23,22 +24,30 @@ class SIP(Component):
         if orientation == 'horizontal':
             self.set_transform(rotation=270)
 
-    def draw(self):
-        g = super().draw()
-        g.elements += [
-            svg.G(
-                class_='pin',
-                transform=[svg.Translate(pin.at_local.x, pin.at_local.y)],
-                elements=[
-                    #svg.Rect(x=-0.2, y=-0.2, width=0.4, height=0.4),
-                    svg.Text(
-                        text=cast(Pin, pin).symbol,
-                        dy=0.1
-                    )
-                ]
-            )
-            for pin in self.connectables.values()
-        ]
+    def paint(self, canvas: Canvas):
+        super().paint(canvas)
+        for pin in self.connectables.values():
+            x, y = pin.at_local
+            canvas.text(self, [self.kind(), ['pins'], [], []], x, y+0.1, cast(Pin, pin).symbol)
+
+    def draw(self, region: tuple[Point, Point] | None=None):
+        g = super().draw(region)
+        g.elements.append(svg.G(
+            class_=['pins'],
+            elements=[
+                svg.G(
+                    transform=[svg.Translate(pin.at_local.x, pin.at_local.y)],
+                    elements=[
+                        #svg.Rect(x=-0.2, y=-0.2, width=0.4, height=0.4),
+                        svg.Text(
+                            text=cast(Pin, pin).symbol,
+                            dy=0.1
+                        )
+                    ]
+                )
+                for pin in self.connectables.values()
+            ]
+        ))
         return g
 
 
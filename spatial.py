@@ -0,0 +1,39 @@
+from collections import defaultdict
+from math import floor
+from typing import Generic, TypeVar
+
+from connect import Box, overlaps
+
+
+T = TypeVar('T')
+
+
+class SpatialIndex(Generic[T]):
+    """
+    Uniform grid of buckets over the bounding boxes of a collection of items,
+    used to find the items overlapping a region without visiting them all.
+    """
+    def __init__(self, cell: float = 8):
+        self.cell = cell
+        self.items: list[tuple[T, Box]] = []
+        self.buckets: dict[tuple[int, int], list[int]] = defaultdict(list)
+
+    def cells(self, box: Box):
+        tl, extent = box
+        for i in range(floor(tl.x / self.cell), floor((tl.x + extent.x) / self.cell) + 1):
+            for j in range(floor(tl.y / self.cell), floor((tl.y + extent.y) / self.cell) + 1):
+                yield (i, j)
+
+    def insert(self, item: T, box: Box):
+        n = len(self.items)
+        self.items.append((item, box))
+        for k in self.cells(box):
+            self.buckets[k].append(n)
+
+    def query(self, box: Box) -> list[T]:
+        """Items overlapping box, in the order they were inserted"""
+        found = {n for k in self.cells(box) for n in self.buckets.get(k, ())}
+        return [
+            self.items[n][0] for n in sorted(found)
+            if overlaps(self.items[n][1], box)
+        ]
@@ -0,0 +1,60 @@
+from collections import OrderedDict
+from functools import wraps
+from hashlib import blake2b
+from typing import Any, Callable, Hashable, TypeVar
+
+
+T = TypeVar('T')
+
+
+def zobrist(*feature: Hashable) -> int:
+    """
+    A stable pseudo-random 64 bit key for one feature of a layout state,
+    e.g. a part at a given position.  A state's hash is the xor of its
+    features' keys, so it can be updated in O(1) as features come and go
+    and doesn't depend on the order they were added.
+    """
+    return int.from_bytes(blake2b(repr(feature).encode(), digest_size=8).digest(), 'little')
+
+
+class TranspositionCache:
+    """
+    Bounded LRU cache of evaluations keyed by layout hash, so a layout
+    state reached again, perhaps by a different sequence of edits,
+    isn't evaluated twice
+    """
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self.entries: OrderedDict[Hashable, Any] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key: Hashable, compute: Callable[[], T]) -> T:
+        """The cached value for key, calling compute on a miss"""
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        self.misses += 1
+        value = self.entries[key] = compute()
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+        return value
+
+    def memoize(self, fn: Callable[..., T]) -> Callable[..., T]:
+        """
+        Decorate fn(layout, *args) to cache its result by layout.hash and args.
+        The hash covers part placements, wires and routed wire paths, but
+        not anything else fn might read, such as the occupancy of each tie
+        """
+        @wraps(fn)
+        def wrapper(layout, *args):
+            return self.get((fn.__qualname__, layout.hash, args), lambda: fn(layout, *args))
+        return wrapper
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = self.misses = 0